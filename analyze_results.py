@@ -1,34 +1,56 @@
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # headless: jangan probe backend GUI
 import matplotlib.pyplot as plt
 import os
 
-df = pd.read_csv("results/metrics.csv")
+# Pakai engine numba untuk agregasi groupby bila tersedia
+try:
+    import numba  # noqa: F401
+    _AGG_KW = {"engine": "numba", "engine_kwargs": {"parallel": True}}
+except Exception:
+    _AGG_KW = {}
+
+# dtype yang sama dengan penulisnya (benchmark_runner.DTYPES):
+# kolom numerik dibaca langsung sebagai float32/int32, bukan float64
+DTYPES = {
+    "payload_bytes": "int32",
+    "qos": "Int8",
+    "iterations": "int32",
+    "latency_p50_ms": "float32",
+    "latency_p95_ms": "float32",
+    "latency_max_ms": "float32",
+    "throughput_msg_per_s": "float32",
+    "loss_percent": "float32",
+    "cpu_percent_client": "float32",
+}
+
+df = pd.read_csv("results/metrics.csv", dtype=DTYPES)
 
 # Ringkas p95 latency & throughput
-summary = df.groupby(["protocol","scenario","payload_bytes"], as_index=False)[["latency_p95_ms","throughput_msg_per_s","loss_percent"]].mean()
+# engine numba tidak mendukung as_index=False -> group biasa lalu reset_index
+summary = df.groupby(["protocol","scenario","payload_bytes"])[["latency_p95_ms","throughput_msg_per_s","loss_percent"]].mean(**_AGG_KW).reset_index()
 summary.to_csv("results/summary.csv", index=False)
 
-# Plot latency p95
-plt.figure()
-for proto in sorted(df['protocol'].dropna().unique()):
-    sub = df[df['protocol']==proto]
-    plt.plot(range(len(sub)), sub['latency_p95_ms'])
-plt.title("Latency p95 per entry (urut input)")
-plt.xlabel("entry")
-plt.ylabel("latency p95 (ms)")
-plt.savefig("results/plot_latency.png", bbox_inches="tight")
-plt.close()
-
-# Plot throughput
-plt.figure()
-for proto in sorted(df['protocol'].dropna().unique()):
-    sub = df[df['protocol']==proto]
-    plt.plot(range(len(sub)), sub['throughput_msg_per_s'])
-plt.title("Throughput per entry (urut input)")
-plt.xlabel("entry")
-plt.ylabel("throughput (msg/s)")
-plt.savefig("results/plot_throughput.png", bbox_inches="tight")
-plt.close()
+# Plot latency p95 & throughput dalam satu pass groupby
+fig_lat, ax_lat = plt.subplots()
+fig_thr, ax_thr = plt.subplots()
+for proto, sub in df.groupby('protocol', sort=True):
+    x = sub.index.to_numpy()
+    ax_lat.plot(x, sub['latency_p95_ms'].to_numpy(), label=proto)
+    ax_thr.plot(x, sub['throughput_msg_per_s'].to_numpy(), label=proto)
+ax_lat.set_title("Latency p95 per entry (urut input)")
+ax_lat.set_xlabel("entry")
+ax_lat.set_ylabel("latency p95 (ms)")
+ax_lat.legend()
+fig_lat.savefig("results/plot_latency.png", bbox_inches="tight")
+plt.close(fig_lat)
+ax_thr.set_title("Throughput per entry (urut input)")
+ax_thr.set_xlabel("entry")
+ax_thr.set_ylabel("throughput (msg/s)")
+ax_thr.legend()
+fig_thr.savefig("results/plot_throughput.png", bbox_inches="tight")
+plt.close(fig_thr)
 
 rec = '''# Rekomendasi Pemilihan Protokol
 
@@ -1,14 +1,31 @@
-import argparse, os, time, threading, asyncio, statistics
+import argparse, os, struct, time, threading, asyncio, statistics, uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import psutil
+import numpy as np
 import pandas as pd
 
 # Optional imports guarded
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except Exception:
     requests = None
 
+# One keep-alive session for all HTTP runs so iterations measure
+# request/response cost instead of TCP connect/teardown.
+if requests is not None:
+    _HTTP_SESSION = requests.Session()
+    _HTTP_SESSION.headers["Connection"] = "keep-alive"
+    _HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=20, pool_block=False))
+else:
+    _HTTP_SESSION = None
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
 try:
     import paho.mqtt.client as mqtt
 except Exception:
@@ -19,52 +36,127 @@ try:
 except Exception:
     Context = Message = POST = None
 
+try:
+    import numba
+except Exception:
+    numba = None
+
+from functools import lru_cache
+
 from tools.payload_gen import gen_payload
 
-def now_ms():
-    return time.perf_counter() * 1000.0
+@lru_cache(maxsize=None)
+def _cached_payload(size: int) -> bytes:
+    # one payload per size, reused across iterations/scenarios so
+    # payload generation never sits on the measured path
+    return gen_payload(size)
 
-def simulate_delay(scenario: str):
-    # emulate network conditions
-    if scenario == "high_latency":
-        time.sleep(0.150)
-    elif scenario == "jittery":
-        time.sleep(0.010)
+# Latensi disimpan sebagai integer nanodetik (time.monotonic_ns) di
+# sepanjang loop pengukuran; konversi ke milidetik hanya di summarize().
+now_ns = time.monotonic_ns
 
-def bench_http(payload, iterations, scenario, host, port):
-    if requests is None:
-        return None, "requests-not-installed"
+_TIMEOUT_NS = 2_000_000_000  # sentinel untuk request gagal/timeout (2s)
+
+# Network conditions for "high_latency" / "jittery" are no longer
+# emulated with per-iteration time.sleep inside the measured loops
+# (that serialized every protocol to the same ~6.6 req/s ceiling).
+# Apply them at the OS level before running instead, e.g.:
+#   tc qdisc add dev lo root netem delay 150ms          # high_latency
+#   tc qdisc add dev lo root netem delay 10ms 5ms       # jittery
+#   tc qdisc del dev lo root                            # cleanup
+
+async def _bench_http_async(payload, iterations, scenario, host, port, concurrency=20):
     url = f"http://{host}:{port}/ingest"
-    lat = []
+    lat = np.empty(iterations, dtype=np.int64)
     ok = 0
+    sem = asyncio.Semaphore(concurrency)
+    # raw bytes + octet-stream: no latin1 decode / JSON re-encode per request
+    body = _cached_payload(payload)
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    headers = {"Content-Type": "application/octet-stream"}
+    async with httpx.AsyncClient(http2=True, limits=limits, timeout=2, headers=headers) as client:
+        async def one(i):
+            nonlocal ok
+            async with sem:
+                t0 = now_ns()
+                try:
+                    r = await client.post(url, content=body, headers={"X-Seq": str(i)})
+                    if r.status_code == 200:
+                        ok += 1
+                    lat[i] = now_ns() - t0
+                except Exception:
+                    lat[i] = _TIMEOUT_NS
+        t_start = now_ns()
+        await asyncio.gather(*(one(i) for i in range(iterations)))
+        wall_ns = now_ns() - t_start
+    return {"lat": lat, "ok": ok, "sent": iterations, "wall_ns": wall_ns}
+
+def _bench_http_serial(payload, iterations, scenario, host, port):
+    # fallback path when httpx is unavailable: keep-alive session, one
+    # request in flight at a time
+    url = f"http://{host}:{port}/ingest"
+    lat = np.empty(iterations, dtype=np.int64)
+    ok = 0
+    body = _cached_payload(payload)
+    t_start = now_ns()
     for i in range(iterations):
-        simulate_delay(scenario)
-        data = {"seq": i, "payload": gen_payload(payload).decode("latin1")}
-        t0 = now_ms()
+        t0 = now_ns()
         try:
-            r = requests.post(url, json=data, timeout=2)
+            r = _HTTP_SESSION.post(
+                url, data=body,
+                headers={"Content-Type": "application/octet-stream", "X-Seq": str(i)},
+                timeout=2)
             if r.status_code == 200:
                 ok += 1
-            t1 = now_ms()
-            lat.append(t1 - t0)
+            lat[i] = now_ns() - t0
         except Exception:
-            lat.append(2000.0)
-    return {"lat": lat, "ok": ok, "sent": iterations}, None
+            lat[i] = _TIMEOUT_NS
+    return {"lat": lat, "ok": ok, "sent": iterations, "wall_ns": now_ns() - t_start}
+
+def bench_http(payload, iterations, scenario, host, port):
+    if httpx is not None:
+        try:
+            res = asyncio.run(_bench_http_async(payload, iterations, scenario, host, port))
+            return res, None
+        except Exception as e:
+            return None, f"http-failed:{e}"
+    if requests is None:
+        return None, "requests-not-installed"
+    return _bench_http_serial(payload, iterations, scenario, host, port), None
 
 def bench_mqtt(payload, iterations, scenario, host, port, topic, qos):
     if mqtt is None:
         return None, "mqtt-not-installed"
     recv = 0
-    lat = []
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"bench-{int(time.time())}")
+    # t0 per seq dicatat saat publish; subscriber tinggal lookup lewat
+    # 4 byte seq di awal payload (tahan reorder, tanpa parsing properties)
+    t0_arr = np.empty(iterations, dtype=np.int64)
+    lat = np.empty(iterations, dtype=np.int64)
+    seen = np.zeros(iterations, dtype=bool)
+    # topik dan client id unik per sel: dengan --jobs > 1 beberapa sel
+    # MQTT berjalan bersamaan, dan topik/client id bersama membuat tiap
+    # subscriber menerima pesan sel lain (latensi sampah dari slot
+    # t0_arr yang belum terisi) serta saling takeover koneksi broker
+    cell_id = uuid.uuid4().hex
+    topic = f"{topic}/bench/{cell_id}"
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
+                         client_id=f"bench-{os.getpid()}-{cell_id[:8]}")
     ev = threading.Event()
 
+    t_last = 0  # waktu terima pesan terakhir yang diterima (akhir window wall-clock)
+
     def on_message(c,u,msg):
-        nonlocal recv
-        t1 = now_ms()
-        # We piggyback t0 in the payload length; simpler approach: measure roundtrip by subscriber loopback
-        lat.append( t1 - float(msg.properties.UserProperty[0][1]) if (msg.properties and msg.properties.UserProperty) else 0.0 )
+        nonlocal recv, t_last
+        t1 = now_ns()
+        if len(msg.payload) < 4:
+            return
+        seq = struct.unpack("<I", msg.payload[:4])[0]
+        if seq >= iterations or seen[seq]:
+            return
+        seen[seq] = True
+        lat[recv] = t1 - t0_arr[seq]
         recv += 1
+        t_last = t1
         if recv >= iterations:
             ev.set()
 
@@ -76,36 +168,45 @@ def bench_mqtt(payload, iterations, scenario, host, port, topic, qos):
     client.subscribe(topic, qos=qos)
     client.loop_start()
 
+    payload_bytes = _cached_payload(payload)
+    t_start = now_ns()
     for i in range(iterations):
-        simulate_delay(scenario)
-        props = mqtt.Properties(mqtt.PacketTypes.PUBLISH)
-        props.UserProperty = [("t0", f"{now_ms()}")]
-        payload_bytes = gen_payload(payload)
-        client.publish(topic, payload_bytes, qos=qos, properties=props)
+        t0_arr[i] = now_ns()
+        client.publish(topic, struct.pack("<I", i) + payload_bytes, qos=qos)
 
     ev.wait(timeout=5.0)
+    # window berakhir di pesan terakhir yang diterima; kalau ada pesan
+    # hilang, sisa timeout ev.wait tidak boleh ikut terhitung throughput
+    wall_ns = (t_last - t_start) if recv else (now_ns() - t_start)
     client.loop_stop()
     client.disconnect()
-    return {"lat": lat, "ok": recv, "sent": iterations}, None
+    return {"lat": lat[:recv], "ok": recv, "sent": iterations, "wall_ns": wall_ns}, None
 
-async def _bench_coap_async(payload, iterations, scenario, host, port):
+async def _bench_coap_async(payload, iterations, scenario, host, port, concurrency=20):
     context = await Context.create_client_context()
     uri = f"coap://{host}:{port}/telemetry"
-    lat = []
+    lat = np.empty(iterations, dtype=np.int64)
     ok = 0
-    for i in range(iterations):
-        simulate_delay(scenario)
-        data = gen_payload(payload)
-        t0 = now_ms()
-        try:
-            req = Message(code=POST, uri=uri, payload=data)
-            resp = await context.request(req).response
-            ok += 1
-            lat.append(now_ms() - t0)
-        except Exception:
-            lat.append(2000.0)
+    sem = asyncio.Semaphore(concurrency)
+    data = _cached_payload(payload)
+
+    async def one(i):
+        nonlocal ok
+        async with sem:
+            t0 = now_ns()
+            try:
+                req = Message(code=POST, uri=uri, payload=data)
+                resp = await context.request(req).response
+                ok += 1
+                lat[i] = now_ns() - t0
+            except Exception:
+                lat[i] = _TIMEOUT_NS
+
+    t_start = now_ns()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    wall_ns = now_ns() - t_start
     await context.shutdown()
-    return {"lat": lat, "ok": ok, "sent": iterations}
+    return {"lat": lat, "ok": ok, "sent": iterations, "wall_ns": wall_ns}
 
 def bench_coap(payload, iterations, scenario, host, port):
     if Context is None:
@@ -116,13 +217,66 @@ def bench_coap(payload, iterations, scenario, host, port):
     except Exception as e:
         return None, f"coap-failed:{e}"
 
+def _lat_stats(arr):
+    # p50/p95 (interpolasi linear, identik np.percentile), max, sum
+    # dalam satu kernel; di-JIT dengan numba bila tersedia
+    srt = np.sort(arr)
+    n = srt.size
+    pos = 0.5 * (n - 1)
+    lo = int(pos)
+    hi = lo + 1 if lo + 1 < n else lo
+    p50 = srt[lo] + (srt[hi] - srt[lo]) * (pos - lo)
+    pos = 0.95 * (n - 1)
+    lo = int(pos)
+    hi = lo + 1 if lo + 1 < n else lo
+    p95 = srt[lo] + (srt[hi] - srt[lo]) * (pos - lo)
+    return p50, p95, srt[n - 1], srt.sum()
+
+if numba is not None:
+    _lat_stats = numba.njit(cache=True)(_lat_stats)
+
+# metrics.csv schema: column order and the dtypes pandas should not
+# have to infer row by row
+COLS = (
+    "protocol", "scenario", "payload_bytes", "qos", "iterations",
+    "latency_p50_ms", "latency_p95_ms", "latency_max_ms",
+    "throughput_msg_per_s", "loss_percent",
+    "mean_payload_bytes", "mean_overhead_bytes",
+    "cpu_percent_client", "cpu_percent_server", "timestamp",
+)
+# downcast: payload/iterations/qos fit in int32/Int8, the millisecond
+# metrics lose nothing that survives round(x, 2) in float32
+DTYPES = {
+    "payload_bytes": "int32",
+    "qos": "Int8",
+    "iterations": "int32",
+    "latency_p50_ms": "float32",
+    "latency_p95_ms": "float32",
+    "latency_max_ms": "float32",
+    "throughput_msg_per_s": "float32",
+    "loss_percent": "float32",
+    "mean_payload_bytes": "int32",
+    "cpu_percent_client": "float32",
+}
+
 def summarize(protocol, scenario, payload, qos, res):
-    lat = [x for x in res["lat"] if x>0]
+    lat_ns = np.asarray(res["lat"], dtype=np.int64)
+    lat = lat_ns[lat_ns > 0].astype(np.float64) * 1e-6  # ns -> ms
     loss = max(0, 100.0 * (1 - (res["ok"]/max(1,res["sent"]))))
-    p50 = (sorted(lat)[len(lat)//2]) if lat else None
-    p95 = (sorted(lat)[int(len(lat)*0.95)-1]) if len(lat)>=1 else None
-    mx  = max(lat) if lat else None
-    thr = (res["ok"] / (sum(lat)/1000.0)) if lat and sum(lat)>0 else 0.0
+    if lat.size:
+        p50, p95, mx, total = _lat_stats(lat)
+    else:
+        p50 = p95 = mx = None
+        total = 0.0
+    # throughput dari wall-clock run, bukan jumlah latensi per-request:
+    # dengan request yang overlap, jumlah latensi ~ concurrency x wall time
+    wall_ns = res.get("wall_ns", 0)
+    if wall_ns > 0:
+        thr = res["ok"] / (wall_ns / 1e9)
+    elif total > 0:
+        thr = res["ok"] / (total / 1000.0)
+    else:
+        thr = 0.0
     return {
         "protocol": protocol,
         "scenario": scenario,
@@ -141,12 +295,33 @@ def summarize(protocol, scenario, payload, qos, res):
         "timestamp": datetime.utcnow().isoformat()
     }
 
+def _run_cell(cell):
+    """Jalankan satu sel sweep (proto, scen, payload, qos) di worker process."""
+    proto, scen, payload, qos, iterations, hosts, topic = cell
+    if proto == "HTTP":
+        res, err = bench_http(payload, iterations, scen, *hosts["HTTP"])
+    elif proto == "MQTT":
+        res, err = bench_mqtt(payload, iterations, scen, *hosts["MQTT"], topic, qos)
+    elif proto == "COAP":
+        res, err = bench_coap(payload, iterations, scen, *hosts["COAP"])
+    else:
+        res, err = None, "unknown-protocol"
+    if res is None:
+        return None, (proto, scen, payload, qos, err)
+    return summarize(proto, scen, payload, qos, res), None
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--output", default="results/metrics.csv")
     ap.add_argument("--protocols", nargs="*", default=[])
+    ap.add_argument("--scenarios", nargs="*", default=[],
+                    help="jalankan hanya skenario tertentu, mis. --scenarios high_latency "
+                         "setelah tc netem di-set; default: semua skenario")
     ap.add_argument("--all", action="store_true")
     ap.add_argument("--iterations", type=int, default=50)
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                    help="jumlah worker process untuk menjalankan sel sweep paralel "
+                         "(server/broker harus sanggup menampung bebannya)")
     args = ap.parse_args()
 
     if args.all or not args.protocols:
@@ -154,8 +329,14 @@ def main():
     else:
         protocols = [p.upper() for p in args.protocols]
 
+    # --all hanya soal protokol; --scenarios tetap dihormati supaya
+    # tiap konfigurasi netem bisa dipasangkan dengan run skenarionya
+    if args.scenarios:
+        scenarios = [s.lower() for s in args.scenarios]
+    else:
+        scenarios = ["normal","high_latency","jittery"]
+
     payloads = [32, 1024, 10*1024]
-    scenarios = ["normal","high_latency","jittery"]
     qos_list = [0,1,2]
 
     HOSTS = {
@@ -165,30 +346,30 @@ def main():
     }
     topic = os.getenv("MQTT_TOPIC","IOTS/LAB/telemetry")
 
-    rows = []
+    cells = []
     for proto in protocols:
         for scen in scenarios:
             for payload in payloads:
                 qos_iter = qos_list if proto=="MQTT" else [None]
                 for qos in qos_iter:
-                    if proto=="HTTP":
-                        res, err = bench_http(payload, args.iterations, scen, *HOSTS["HTTP"])
-                    elif proto=="MQTT":
-                        res, err = bench_mqtt(payload, args.iterations, scen, *HOSTS["MQTT"], topic, qos)
-                    elif proto=="COAP":
-                        res, err = bench_coap(payload, args.iterations, scen, *HOSTS["COAP"])
-                    else:
-                        res, err = None, "unknown-protocol"
-
-                    if res is None:
-                        print(f"[WARN] Skip {proto} scen={scen} payload={payload} qos={qos} reason={err}")
-                        continue
-                    rows.append(summarize(proto, scen, payload, qos, res))
+                    cells.append((proto, scen, payload, qos, args.iterations, HOSTS, topic))
+
+    # sel-sel independen (socket/context masing-masing) -> jalankan paralel;
+    # executor.map menjaga urutan hasil sama dengan urutan sweep serial
+    cols = {k: [] for k in COLS}
+    with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+        for row, warn in ex.map(_run_cell, cells):
+            if row is None:
+                proto, scen, payload, qos, err = warn
+                print(f"[WARN] Skip {proto} scen={scen} payload={payload} qos={qos} reason={err}")
+                continue
+            for k in COLS:
+                cols[k].append(row[k])
 
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    import pandas as pd
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(cols)
     if not df.empty:
+        df = df.astype(DTYPES)
         df.to_csv(args.output, index=False)
         print(f"[OK] wrote {args.output}")
     else:
@@ -9,6 +9,7 @@ import aiocoap
 import aiocoap.resource as resource
 import logging
 import json
+import orjson
 from datetime import datetime
 from dotenv import load_dotenv
 import os
@@ -24,10 +25,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger('CoAP_Server')
 
+# Interval refresh cache statistik (detik): GET stats mengembalikan
+# bytes hasil serialisasi terakhir, bukan menghitung ulang per request
+STATS_REFRESH_SECONDS = 0.1
+
 
 class TelemetryResource(resource.Resource):
     """CoAP Resource untuk telemetri IoT"""
-    
+
     def __init__(self):
         super().__init__()
         self.stats = {
@@ -37,25 +42,34 @@ class TelemetryResource(resource.Resource):
             'total_bytes': 0,
             'start_time': time.time()
         }
-    
-    async def render_get(self, request):
-        """
-        Handle GET request - return statistics
-        """
+        self._stats_cache = b'{}'
+        self._refresh_stats_cache()
+
+    def _current_stats(self):
+        """Statistik turunan (uptime, rate) dari counter mentah"""
         uptime = time.time() - self.stats['start_time']
         stats_copy = self.stats.copy()
         stats_copy['uptime_seconds'] = uptime
-        
+
         if uptime > 0:
             stats_copy['requests_per_second'] = stats_copy['total_requests'] / uptime
-        
-        payload = json.dumps(stats_copy, indent=2)
-        
+
+        return stats_copy
+
+    def _refresh_stats_cache(self):
+        """Serialisasi ulang cache statistik lalu jadwalkan refresh berikutnya"""
+        self._stats_cache = orjson.dumps(self._current_stats(), option=orjson.OPT_INDENT_2)
+        asyncio.get_event_loop().call_later(STATS_REFRESH_SECONDS, self._refresh_stats_cache)
+
+    async def render_get(self, request):
+        """
+        Handle GET request - return statistics (cached bytes)
+        """
         logger.info("GET request - returning statistics")
-        
+
         return aiocoap.Message(
             code=aiocoap.CONTENT,
-            payload=payload.encode('utf-8')
+            payload=self._stats_cache
         )
     
     async def render_post(self, request):
@@ -93,7 +107,7 @@ class TelemetryResource(resource.Resource):
                 
                 return aiocoap.Message(
                     code=aiocoap.CHANGED,
-                    payload=json.dumps(response_data).encode('utf-8')
+                    payload=orjson.dumps(response_data)
                 )
                 
             except (json.JSONDecodeError, UnicodeDecodeError) as e:
@@ -117,16 +131,18 @@ class TelemetryResource(resource.Resource):
 
 class StatsResource(resource.Resource):
     """Resource untuk statistik server"""
-    
+
     def __init__(self, telemetry_resource):
         super().__init__()
         self.telemetry_resource = telemetry_resource
-    
-    async def render_get(self, request):
-        """Return server statistics"""
+        self._stats_cache = b'{}'
+        self._refresh_stats_cache()
+
+    def _refresh_stats_cache(self):
+        """Serialisasi ulang cache statistik lalu jadwalkan refresh berikutnya"""
         stats = self.telemetry_resource.stats
         uptime = time.time() - stats['start_time']
-        
+
         stats_data = {
             'total_requests': stats['total_requests'],
             'successful_requests': stats['successful_requests'],
@@ -135,12 +151,15 @@ class StatsResource(resource.Resource):
             'uptime_seconds': uptime,
             'requests_per_second': stats['total_requests'] / uptime if uptime > 0 else 0
         }
-        
-        payload = json.dumps(stats_data, indent=2)
-        
+
+        self._stats_cache = orjson.dumps(stats_data, option=orjson.OPT_INDENT_2)
+        asyncio.get_event_loop().call_later(STATS_REFRESH_SECONDS, self._refresh_stats_cache)
+
+    async def render_get(self, request):
+        """Return server statistics (cached bytes)"""
         return aiocoap.Message(
             code=aiocoap.CONTENT,
-            payload=payload.encode('utf-8')
+            payload=self._stats_cache
         )
 
 
@@ -25,4 +25,11 @@ def metrics():
     return jsonify({"requests": counter, "cpu_percent": cpu})
 
 if __name__ == "__main__":
-    app.run(host=HOST, port=PORT)
+    # Dev server Flask hanya untuk debugging; untuk benchmark jalankan
+    # lewat gunicorn (lihat run_http_server.sh) supaya server bukan
+    # bottleneck pengukuran.
+    if os.getenv("DEV_SERVER"):
+        app.run(host=HOST, port=PORT)
+    else:
+        print("Refusing to start the Flask dev server for benchmarking.")
+        print("Use ./run_http_server.sh (gunicorn), or set DEV_SERVER=1 to force.")
@@ -38,6 +38,17 @@ stats = {
 stats_lock = Lock()
 
 
+def _record_request(ok, nbytes=0):
+    """Update statistik request dengan satu akuisisi lock"""
+    with stats_lock:
+        if ok:
+            stats['total_requests'] += 1
+            stats['successful_requests'] += 1
+            stats['total_bytes'] += nbytes
+        else:
+            stats['failed_requests'] += 1
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -78,27 +89,22 @@ def ingest_data():
         # Get request data
         if not request.is_json:
             logger.warning("Received non-JSON request")
-            with stats_lock:
-                stats['failed_requests'] += 1
+            _record_request(ok=False)
             return jsonify({'error': 'Content-Type must be application/json'}), 400
-        
+
         data = request.get_json()
-        
+
         # Validate required fields
         if not data or 'device_id' not in data:
             logger.warning("Missing required field: device_id")
-            with stats_lock:
-                stats['failed_requests'] += 1
+            _record_request(ok=False)
             return jsonify({'error': 'device_id is required'}), 400
-        
+
         # Get payload size
         payload_size = len(request.data)
-        
-        # Update statistics
-        with stats_lock:
-            stats['total_requests'] += 1
-            stats['successful_requests'] += 1
-            stats['total_bytes'] += payload_size
+
+        # Update statistics (satu blok lock untuk semua counter)
+        _record_request(ok=True, nbytes=payload_size)
         
         # Log received data
         logger.info(f"Received data from {data.get('device_id')} - {payload_size} bytes")
@@ -115,14 +121,12 @@ def ingest_data():
         
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON: {e}")
-        with stats_lock:
-            stats['failed_requests'] += 1
+        _record_request(ok=False)
         return jsonify({'error': 'Invalid JSON format'}), 400
-        
+
     except Exception as e:
         logger.error(f"Error processing request: {e}")
-        with stats_lock:
-            stats['failed_requests'] += 1
+        _record_request(ok=False)
         return jsonify({'error': 'Internal server error'}), 500
 
 
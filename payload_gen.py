@@ -6,19 +6,25 @@ Support binary dan text payload, dengan base64 encoding untuk HTTP
 
 import json
 import base64
+import os
 import random
-import string
 from datetime import datetime
 
 
 def generate_random_string(length):
     """Generate random string dengan panjang tertentu"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+    # base64 dari kernel RNG jauh lebih cepat daripada loop random.choices
+    return base64.b64encode(os.urandom(length * 3 // 4 + 3))[:length].decode('ascii')
 
 
 def generate_random_bytes(length):
     """Generate random bytes dengan panjang tertentu"""
-    return bytes([random.randint(0, 255) for _ in range(length)])
+    return os.urandom(length)
+
+
+# Buffer padding persisten: slicing string ini O(size memcpy),
+# jauh lebih murah daripada generate random string per payload
+_PAD_STR = base64.b64encode(os.urandom(48 * 1024)).decode('ascii')  # 64 KiB chars
 
 
 def generate_sensor_data(target_size_bytes, data_type='json'):
@@ -65,11 +71,15 @@ def generate_sensor_data(target_size_bytes, data_type='json'):
         base_json = json.dumps(base_data)
         current_size = len(base_json.encode('utf-8'))
         
-        # Pad jika masih kurang
+        # Pad jika masih kurang (slice dari buffer persisten, bukan generate baru)
         if current_size < target_size_bytes:
             padding_size = target_size_bytes - current_size - 30  # Reserve for JSON overhead
             if padding_size > 0:
-                base_data['padding'] = generate_random_string(padding_size)
+                if padding_size <= len(_PAD_STR):
+                    base_data['padding'] = _PAD_STR[:padding_size]
+                else:
+                    reps = padding_size // len(_PAD_STR) + 1
+                    base_data['padding'] = (_PAD_STR * reps)[:padding_size]
         
         return base_data
 
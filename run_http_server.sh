@@ -0,0 +1,14 @@
+#!/usr/bin/env bash
+# Jalankan HTTP server lewat gunicorn (worker gevent) supaya server
+# produksi yang diukur benchmark, bukan dev server Flask.
+set -euo pipefail
+
+HOST="${HTTP_HOST:-127.0.0.1}"
+PORT="${HTTP_PORT:-5000}"
+WORKERS="${HTTP_WORKERS:-$(nproc)}"
+
+exec gunicorn \
+    --workers "$WORKERS" \
+    --worker-class gevent \
+    --bind "$HOST:$PORT" \
+    http_server:app